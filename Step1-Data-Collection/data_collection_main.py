@@ -16,20 +16,21 @@ Modules:
 - uart_module               : Manages UART communication for sending control commands.
 - picamera_module           : Interfaces with the Raspberry Pi Camera for image capture.
 
-Global Variables:
------------------
-- done      : Flag variable to terminate the program.
-- record    : Flag variable to control recording status.
-- key_val   : Current pressed key.
-- key_old   : Last pressed key
-- speed     : Speed
-- angle     : Steering angle
+Classes:
+--------
+- State : Mutable state of the control loop, shared by the functions below.
+    - done      : Flag variable to terminate the program.
+    - record    : Flag variable to control recording status.
+    - key_val   : Current pressed key.
+    - key_old   : Last pressed key
+    - speed     : Speed
+    - angle     : Steering angle
 
 Functions:
 ----------
-- get_key_press()               : Get key press status and update global variables.
-- update_movement_controls()    : Update speed and angle based on key presses.
-- send_movement_commands()      : Send movement commands over UART based on current speed and angle.
+- get_key_press(state)              : Get key press status and update the state.
+- update_movement_controls(state)   : Update speed and angle based on key presses.
+- send_movement_commands(state)     : Send movement commands over UART based on current speed and angle.
 - main()                        : Main function to control the car's movement, handle key presses, and manage data recording.
 
 
@@ -63,6 +64,8 @@ This script is designed to control an autonomous car system and requires proper
 
 # Importing necessary modules
 import os
+import time
+from dataclasses            import dataclass
 from data_collection_module import DataCollector
 from key_press_module       import KeyPressController
 from uart_module            import UartController
@@ -73,14 +76,26 @@ KEY_LIST = ["RIGHT", "LEFT", "UP", "DOWN", "r", "s", "k"]
 SERIAL_PORT = "/dev/ttyS0"
 BAUD_RATE = 9600
 ROI = (0.0, 0.2, 0.8, 0.8) # Ratio of interest
-
-# Global Variables
-done    = 0     # Flag variable to terminate the program
-record  = 0     # Flag variable to control recording status
-key_val = None  # Current pressed key
-key_old = None  # Last pressed key
-speed   = 0     # Initial speed
-angle   = 0     # Initial steering angle
+LOOP_PERIOD = 1 / 30       # Control loop period in seconds (camera frame rate)
+MOVEMENT_KEYS = {          # Key -> (speed, angle)
+    "RIGHT" : (0.5, 0.5),
+    "LEFT"  : (0.5, -0.5),
+    "UP"    : (0.5, 0),
+    "DOWN"  : (-0.5, 0),
+    "s"     : (0, 0),
+}
+
+@dataclass
+class State:
+    """
+    Mutable state of the control loop.
+    """
+    done    : int = 0       # Flag variable to terminate the program
+    record  : int = 0       # Flag variable to control recording status
+    key_val : str = None    # Current pressed key
+    key_old : str = None    # Last pressed key
+    speed   : float = 0     # Initial speed
+    angle   : float = 0     # Initial steering angle
 
 # Initializing modules
 data_collector = DataCollector()
@@ -88,82 +103,71 @@ data_collector.data_collection_init()
 
 key_controller = KeyPressController()
 key_controller.key_press_init()
+KEY_CODES = [(key, key_controller.get_key_code(key)) for key in KEY_LIST]
 
 uart_controller = UartController(SERIAL_PORT, BAUD_RATE)
 
 camera_controller = PiCameraController()
 camera_controller.pi_cam_init(ROI)
 
-def get_key_press():
+def get_key_press(state):
     """
-    Get key press status and update global variables.
+    Get key press status and update the state.
     
-    This function checks the status of each key in the KEY_LIST and updates the key_val accordingly.
+    This function reads the pressed keys once and sets key_val to the first key of KEY_LIST that is held down.
     
     Args:
-        None
+        state (State): The control loop state.
     
     Returns:
         None
     """
-    global key_val
-    for key in KEY_LIST:
-        if key_controller.get_key_status(key):
-            key_val = key
+    pressed_keys = key_controller.get_pressed_keys()
+    for key, key_code in KEY_CODES:
+        if key_code in pressed_keys:
+            state.key_val = key
             break
 
-def update_movement_controls():
+def update_movement_controls(state):
     """
     Update speed and angle based on key presses.
     
     This function updates the speed and angle variables based on the current pressed key.
     
     Args:
-        None
+        state (State): The control loop state.
     
     Returns:
         None
     """
-    global speed, angle, record, done, key_val, key_old
-    if key_val == "RIGHT":
-        speed = 0.5
-        angle = speed
-    elif key_val == "LEFT":
-        speed = 0.5
-        angle = -speed
-    elif key_val == "UP":
-        speed = 0.5
-        angle = 0
-    elif key_val == "DOWN":
-        speed = -0.5
-        angle = 0
-    elif key_val == "s":
-        speed = 0
-        angle = 0
+    key_val = state.key_val
+    movement = MOVEMENT_KEYS.get(key_val)
+    if movement is not None:
+        state.speed, state.angle = movement
     elif key_val == "k":
-        done += 1
-    elif key_val == key_old:
+        state.done += 1
+    elif key_val == state.key_old:
         pass
     elif key_val == "r":
-        key_old = key_val
-        record += 1
+        state.key_old = key_val
+        state.record += 1
     if key_val != "r":
-        key_val = None
-        key_old = None
+        state.key_val = None
+        state.key_old = None
 
-def send_movement_commands():
+def send_movement_commands(state):
     """
     Send movement commands over UART based on current speed and angle.
     
     This function formats the speed and angle into a string and sends it over UART.
     
     Args:
-        None
+        state (State): The control loop state.
     
     Returns:
         None
     """
-    command = f"{speed},{angle}"
+    command = f"{state.speed},{state.angle}"
     uart_controller.send_data(command)
 
 def main():
@@ -171,6 +175,7 @@ def main():
     Main function to control the car's movement.
     
     This function continuously monitors key presses, updates movement controls, and manages data recording.
+    Each iteration is paced to the camera frame rate rather than spinning as fast as possible.
     
     Args:
         None
@@ -178,37 +183,48 @@ def main():
     Returns:
         None
     """
-    global speed, angle, record, done, key_val, key_old
-    while True:
-        angle = 0
-        get_key_press()
-        update_movement_controls()
-        send_movement_commands()
-
-        # Start recording
-        if record == 1:
-            print("Recording Started ...")
-            while os.path.exists(os.path.join(data_collector.data_directory, f"img{str(data_collector.folder_index)}")):
+    state = State()
+    next_tick = time.monotonic()
+    try:
+        while True:
+            state.angle = 0
+            get_key_press(state)
+            update_movement_controls(state)
+            send_movement_commands(state)
+            uart_controller.flush()
+
+            # Start recording
+            if state.record == 1:
+                print("Recording Started ...")
+                new_path = os.path.join(data_collector.data_directory, f"img{str(data_collector.folder_index)}")
+                os.makedirs(new_path)
+                state.record += 1
+            # Collect data
+            if state.record == 2:
+                data_collector.collect_data(camera_controller, new_path, state.speed, state.angle)
+            # Save data and reset
+            elif state.record == 3:
+                state.record = 0
+                data_collector.save_log()
                 data_collector.folder_index += 1
-            new_path = os.path.join(data_collector.data_directory, f"img{str(data_collector.folder_index)}")
-            os.makedirs(new_path)
-            record += 1
-        # Collect data
-        if record == 2:
-            data_collector.collect_data(camera_controller, new_path, speed, angle)
-        # Save data and reset
-        elif record == 3:
-            record = 0
-            data_collector.save_log()
-            data_collector.img_list.clear()
-            data_collector.speed_list.clear()
-            data_collector.angle_list.clear()
-
-        # Terminate program
-        if done != 0:
-            uart_controller.send_data("stop")
-            uart_controller.close()
-            break
+                data_collector.clear_log()
+
+            # Terminate program
+            if state.done != 0:
+                break
+
+            # Sleep until the next frame is due
+            next_tick += LOOP_PERIOD
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+    finally:
+        # Stop the car on exit as well as on any error, e.g. when saving images fails
+        uart_controller.send_data("stop")
+        uart_controller.close()
+        camera_controller.close()
 
 if __name__ == "__main__":
     main()
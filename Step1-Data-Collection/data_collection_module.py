@@ -2,7 +2,7 @@
 Data Collection Module
 ======================
 
-This module provides a simple interface to collect data by logging images and associated speed and angle information using pandas.
+This module provides a simple interface to collect data by logging images and associated speed and angle information in CSV log files.
 
 Classes:
 --------
@@ -24,16 +24,21 @@ To test this module, you can run it directly as a script. It will collect data a
 
 Dependencies:
 -------------
-- pandas: Ensure that the `pandas` library is installed and properly configured on your system.
+- numpy: Ensure that the `numpy` library is installed.
 
 Note:
 -----
 This script is intended to run on a Raspberry Pi with a connected camera module.
 """
 
-import pandas as pd
+import numpy as np
+import csv
 import os
-from datetime import datetime
+import re
+import time
+
+FOLDER_PATTERN = re.compile(r"img(\d+)")  # Name of the image folder of each recording session
+LOG_CAPACITY = 10000                      # Initial number of samples the log buffers can hold
 
 class DataCollector:
     """
@@ -43,7 +48,7 @@ class DataCollector:
         """
         Initialize DataCollector instance.
 
-        This method initializes the data directory and lists.
+        This method initializes the data directory and log buffers.
         
         Args:
         None
@@ -53,15 +58,17 @@ class DataCollector:
         """
         self.data_directory = None
         self.folder_index = None
+        self.sample_count = 0
         self.img_list = []
-        self.speed_list = []
-        self.angle_list = []
+        self.speed_list = None
+        self.angle_list = None
 
     def data_collection_init(self):
         """
         Initialize data collection.
 
-        This method creates the data directory and initializes lists for image paths, speeds, and steering angles.
+        This method creates the data directory and preallocates buffers for image paths, speeds, and steering angles.
+        The data directory is scanned once so that `folder_index` points to the first unused image folder.
         
         Args:
         None
@@ -72,10 +79,14 @@ class DataCollector:
         self.data_directory = os.path.join(os.getcwd(), 'data_collected')
         if not os.path.exists(self.data_directory):
             os.makedirs(self.data_directory)
-        self.folder_index = 0
-        self.img_list = []
-        self.speed_list = []
-        self.angle_list = []
+        used_indices = [int(match.group(1)) for match in
+                        (FOLDER_PATTERN.fullmatch(entry.name) for entry in os.scandir(self.data_directory))
+                        if match]
+        self.folder_index = max(used_indices) + 1 if used_indices else 0
+        self.sample_count = 0
+        self.img_list = [None] * LOG_CAPACITY
+        self.speed_list = np.empty(LOG_CAPACITY, dtype=np.float32)
+        self.angle_list = np.empty(LOG_CAPACITY, dtype=np.float32)
 
     def collect_data(self, camera_controller, img_path, speed, angle):
         """
@@ -90,13 +101,30 @@ class DataCollector:
         Returns:
         None
         """
-        now = datetime.now()
-        timestamp = str(datetime.timestamp(now)).replace('.', '')
-        img_name = f"{os.path.join(img_path, f'img_{len(self.img_list)}_{timestamp}')}"
+        index = self.sample_count
+        img_name = os.path.join(img_path, f"img_{index}_{time.time_ns() // 1000}")
         camera_controller.get_img(img_name)
-        self.img_list.append(img_name)
-        self.speed_list.append(speed)
-        self.angle_list.append(angle)
+        if index == len(self.speed_list):
+            self.grow_log()
+        self.img_list[index] = img_name
+        self.speed_list[index] = speed
+        self.angle_list[index] = angle
+        self.sample_count += 1
+
+    def grow_log(self):
+        """
+        Double the capacity of the log buffers, keeping the samples collected so far.
+
+        Args:
+        None
+        
+        Returns:
+        None
+        """
+        capacity = len(self.speed_list)
+        self.img_list.extend([None] * capacity)
+        self.speed_list = np.concatenate((self.speed_list, np.empty(capacity, dtype=np.float32)))
+        self.angle_list = np.concatenate((self.angle_list, np.empty(capacity, dtype=np.float32)))
 
     def save_log(self):
         """
@@ -108,10 +136,23 @@ class DataCollector:
         Returns:
         None
         """
-        print(f"img: {len(self.img_list)}, speed:{len(self.speed_list)}, angle:{len(self.angle_list)}")
-        raw_data = {'image': self.img_list, 'speed': self.speed_list, 'angle': self.angle_list}
-        df = pd.DataFrame(raw_data)
+        count = self.sample_count
         log_file_path = os.path.join(self.data_directory, f'log_{str(self.folder_index)}.csv')
-        df.to_csv(log_file_path, index=False, header=False)
+        with open(log_file_path, 'w', newline='') as log_file:
+            csv.writer(log_file).writerows(zip(self.img_list[:count], self.speed_list[:count], self.angle_list[:count]))
         print('Log saved')
-        print('Total images:', len(self.img_list))
+        print('Total images:', count)
+
+    def clear_log(self):
+        """
+        Discard the logged samples so that a new recording can start.
+
+        The buffers are kept and overwritten by the next recording.
+
+        Args:
+        None
+        
+        Returns:
+        None
+        """
+        self.sample_count = 0
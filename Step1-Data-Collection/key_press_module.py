@@ -3,6 +3,7 @@ Key Press Module
 =======================
 
 This module provides a simple interface to initialize Pygame and check for key presses.
+Key state is tracked from Pygame's KEYDOWN/KEYUP events, so the event queue is drained once per check.
 
 Classes:
 --------
@@ -42,14 +43,16 @@ class KeyPressController:
     Attributes:
     -----------
     window: Pygame display surface.
+    pressed_keys: Set of Pygame key codes currently held down.
     """
     def __init__(self):
         """
         Initialize the KeyPressController class.
 
-        Initializes the window attribute to None.
+        Initializes the window attribute to None and the set of pressed keys to empty.
         """
         self.window = None
+        self.pressed_keys = set()
 
     def key_press_init(self):
         """
@@ -66,6 +69,38 @@ class KeyPressController:
         pygame.init()
         self.window = pygame.display.set_mode((100, 100))
 
+    def get_key_code(self, key_name):
+        """
+        Get the Pygame key code of a key.
+
+        Args:
+        key_name (str): The name of the key, e.g. "r" or "UP".
+        
+        Returns:
+        int: The Pygame key code.
+        """
+        return getattr(pygame, 'K_{}'.format(key_name))
+
+    def get_pressed_keys(self):
+        """
+        Get the keys that are currently pressed.
+
+        This method drains the Pygame event queue and updates the set of pressed keys
+        from the KEYDOWN and KEYUP events it contains.
+        
+        Args:
+        None
+        
+        Returns:
+        set: The Pygame key codes currently held down.
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.KEYDOWN:
+                self.pressed_keys.add(event.key)
+            elif event.type == pygame.KEYUP:
+                self.pressed_keys.discard(event.key)
+        return self.pressed_keys
+
     def get_key_status(self, key_name):
         """
         Check if a specific key is pressed.
@@ -78,14 +113,7 @@ class KeyPressController:
         Returns:
         bool: True if the key is pressed, False otherwise.
         """
-        ans = False
-        my_key = getattr(pygame, 'K_{}'.format(key_name))
-        for event in pygame.event.get():
-            pass
-        key_input = pygame.key.get_pressed()
-        ans = key_input[my_key]
-        pygame.display.update()
-        return ans
+        return self.get_key_code(key_name) in self.get_pressed_keys()
 
 def main():
     """
@@ -1,6 +1,7 @@
 print('Setting UP')
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+import tensorflow as tf
 from sklearn.model_selection import train_test_split
 from utils import *
 
@@ -29,7 +30,12 @@ print('Total Validation Images: ', len(xVal))
 #### STEP 6 - PREPROCESS
 
 #### STEP 7 - CREATE MODEL
-model = createModel()
+# 'elu' runs on the CPU only; use 'relu' for a model that will be compiled for the Coral Edge TPU
+ACTIVATION = 'elu'
+# Train in float16 on GPUs (tensor cores); the output layer stays float32
+if tf.config.list_physical_devices('GPU'):
+    tf.keras.mixed_precision.set_global_policy('mixed_float16')
+model = createModel(ACTIVATION)
 
 #### STEP 8 - TRAINING
 history = model.fit(dataGen(xTrain, yTrain_speed, yTrain_angle, 100, 1),
@@ -40,6 +46,8 @@ history = model.fit(dataGen(xTrain, yTrain_speed, yTrain_angle, 100, 1),
 
 #### STEP 9 - SAVE THE MODEL
 model.save('model.h5')
+saveTfliteModel(model, xVal, 'model.tflite', activation=ACTIVATION)
+saveTfliteModel(model, xVal, 'model_fp16.tflite', quantization='float16', activation=ACTIVATION)
 print('Model Saved')
 
 #### STEP 10 - PLOT THE RESULTS
@@ -2,34 +2,23 @@ import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.utils import shuffle
 import cv2
 
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv2D, Flatten, Dense
+from tensorflow.keras.layers import Conv2D, Flatten, Dense, RandomTranslation, RandomZoom, Rescaling
 from tensorflow.keras.optimizers import Adam
 
 import matplotlib.image as mpimg
-import imgaug.augmenters as iaa
-
-import random
 
 #### STEP 1 - INITIALIZE DATA
-def getName(filePath):
-    # Extracts only the filename from the path
-    myImagePathL = filePath.split('/')[-2:]
-    myImagePath = os.path.join(myImagePathL[0], myImagePathL[1])
-    return myImagePath
-
 def importDataInfo(path):
     # Reads CSV files and imports data while extracting filenames
     columns = ['Center', 'Speed', 'Angle']
-    data = pd.DataFrame()
-    for x in range(17, 22):
-        dataNew = pd.read_csv(os.path.join(path, f'log_{x}.csv'), names=columns)
-        dataNew['Center'] = dataNew['Center'].apply(getName)
-        data = data.append(dataNew, ignore_index=True)
+    data = pd.concat([pd.read_csv(os.path.join(path, f'log_{x}.csv'), names=columns) for x in range(17, 22)],
+                     ignore_index=True)
+    # Keep only the image folder and file name of each path
+    data['Center'] = data['Center'].str.split('/').str[-2:].str.join(os.sep)
     print('Total Images Imported:', data.shape[0])
     return data
 
@@ -39,8 +28,13 @@ def balanceData(data, display=True):
     nBin = 31
     samplesPerBin = 300
     
-    hist_speed, bins_speed = np.histogram(data['Speed'], nBin)
-    hist_angle, bins_angle = np.histogram(data['Angle'], nBin)
+    bins_speed = np.histogram_bin_edges(data['Speed'], nBin)
+    bins_angle = np.histogram_bin_edges(data['Angle'], nBin)
+    # Bin indices of every sample, computed once (values on the last edge go to the last bin)
+    speedBins = np.clip(np.digitize(data['Speed'].values, bins_speed) - 1, 0, nBin - 1)
+    angleBins = np.clip(np.digitize(data['Angle'].values, bins_angle) - 1, 0, nBin - 1)
+    hist_speed = np.bincount(speedBins, minlength=nBin)
+    hist_angle = np.bincount(angleBins, minlength=nBin)
     
     if display:
         center_speed = (bins_speed[:-1] + bins_speed[1:]) * 0.5
@@ -65,25 +59,22 @@ def balanceData(data, display=True):
         plt.show()
     
     # Remove excess samples to balance data
-    removeindexList = []
-    for j in range(nBin):
-        binDataList = []
-        for i in range(len(data)):
-            if data['Speed'].iloc[i] >= bins_speed[j] and data['Speed'].iloc[i] <= bins_speed[j + 1] and \
-               data['Angle'].iloc[i] >= bins_angle[j] and data['Angle'].iloc[i] <= bins_angle[j + 1]:
-                binDataList.append(i)
-                
-        binDataList = shuffle(binDataList)
-        binDataList = binDataList[samplesPerBin:]
-        removeindexList.extend(binDataList)
+    # Samples whose speed and angle fall in the same bin are shuffled, and every such sample
+    # after the first samplesPerBin of its bin is removed
+    binDataList = np.random.permutation(np.flatnonzero(speedBins == angleBins))
+    binRank = pd.Series(speedBins[binDataList]).groupby(speedBins[binDataList]).cumcount().to_numpy()
+    removeindexList = binDataList[binRank >= samplesPerBin]
+    keep = np.ones(len(data), dtype=bool)
+    keep[removeindexList] = False
 
     print('Removed Images:', len(removeindexList))
-    data.drop(data.index[removeindexList], inplace=True)
+    data = data[keep]
     print('Remaining Images:', len(data))
     
     if display:
-        hist_speed, _ = np.histogram(data['Speed'], (nBin))
-        hist_angle, _ = np.histogram(data['Angle'], (nBin))
+        # Reuse the bin indices of the remaining samples
+        hist_speed = np.bincount(speedBins[keep], minlength=nBin)
+        hist_angle = np.bincount(angleBins[keep], minlength=nBin)
         
         plt.figure(figsize=(12, 6))
         plt.subplot(1, 2, 1)
@@ -108,78 +99,121 @@ def balanceData(data, display=True):
 #### STEP 3 - PREPARE FOR PROCESSING
 def loadData(path, data):
     # Loads image paths, speeds, and angles from the dataset
-    imagesPath = np.array([os.path.join(path, img_path) for img_path in data['Center']])
-    speeds = np.array(data['Speed'])
-    angles = np.array(data['Angle'])
+    imagesPath = (os.path.join(path, '') + data['Center']).to_numpy()
+    speeds = data['Speed'].to_numpy(dtype=np.float32)
+    angles = data['Angle'].to_numpy(dtype=np.float32)
     return imagesPath, speeds, angles
 
 #### STEP 5 - AUGMENT DATA
-def augmentImage(imgPath, speed, angle):
-    # Augments images with various techniques
-    img = mpimg.imread(imgPath)
-    seq = iaa.Sequential([
-        iaa.Affine(translate_percent={"x": (-0.1, 0.1), "y": (-0.1, 0.1)}),
-        iaa.Affine(scale=(1, 1.2)),
-        iaa.Multiply((0.5, 1.2)),
-        iaa.Fliplr(1.0)
-    ], random_order=True)
-
-    augmented = seq.augment_image(img)
-    if np.random.rand() < 0.5:
-        augmented = cv2.flip(augmented, 1)
-        angle = -angle
-    
-    return augmented, speed, angle
+YUV_OFFSET = tf.constant([0., 128., 128.])  # Value of zero chroma in preprocessed images
+
+def createAugmentation():
+    # Random shifts and zooms, run inside the model on whole batches and only while training
+    return Sequential([
+        RandomTranslation(0.1, 0.1, input_shape=(66, 200, 3)),
+        RandomZoom((-0.2, 0)),
+    ], name='augmentation')
+
+def augmentBatch(img, angle):
+    # Randomly scales the brightness of a batch of preprocessed YUV images and mirrors them together
+    # with their steering angles, with one set of vectorized ops per batch
+    batchSize = tf.shape(img)[0]
+    img = tf.clip_by_value((img - YUV_OFFSET) * tf.random.uniform([batchSize, 1, 1, 1], 0.5, 1.2) + YUV_OFFSET, 0, 255)
+    flip = tf.random.uniform([batchSize]) < 0.5
+    img = tf.where(flip[:, tf.newaxis, tf.newaxis, tf.newaxis], tf.reverse(img, axis=[2]), img)
+    angle = tf.where(flip, -angle, angle)
+    return img, angle
 
 #### STEP 6 - PREPROCESS
 def preProcess(img):
-    # Preprocesses images (converts to YUV, applies blur, resizes, normalizes)
+    # Preprocesses images (resizes, converts to YUV); the model normalizes them
+    # Area resizing averages the pixels it shrinks, which already smooths the image like a blur would
+    # Resizing first lets the colour conversion work on the small image; must match Step3-Implementation
+    img = cv2.resize(img, (200, 66), interpolation=cv2.INTER_AREA)
     img = cv2.cvtColor(img, cv2.COLOR_RGB2YUV)
-    img = cv2.GaussianBlur(img, (3, 3), 0)
-    img = cv2.resize(img, (200, 66))
-    img = img / 255
     return img
 
 #### STEP 7 - CREATE MODEL
-def createModel():
+def createModel(activation='elu'):
     # Defines the convolutional neural network model
+    # The Edge TPU has no ELU op, so a model for it must be trained with activation='relu'
     model = Sequential()
 
-    model.add(Conv2D(24, (5, 5), (2, 2), input_shape=(66, 200, 3), activation='elu'))
-    model.add(Conv2D(36, (5, 5), (2, 2), activation='elu'))
-    model.add(Conv2D(48, (5, 5), (2, 2), activation='elu'))
-    model.add(Conv2D(64, (3, 3), activation='elu'))
-    model.add(Conv2D(64, (3, 3), activation='elu'))
+    model.add(createAugmentation())
+    model.add(Rescaling(1 / 255))  # Normalize the uint8 YUV images
+    model.add(Conv2D(24, (5, 5), (2, 2), activation=activation))
+    model.add(Conv2D(36, (5, 5), (2, 2), activation=activation))
+    model.add(Conv2D(48, (5, 5), (2, 2), activation=activation))
+    model.add(Conv2D(64, (3, 3), activation=activation))
+    model.add(Conv2D(64, (3, 3), activation=activation))
 
     model.add(Flatten())
-    model.add(Dense(100, activation='elu'))
-    model.add(Dense(50, activation='elu'))
-    model.add(Dense(10, activation='elu'))
-    model.add(Dense(1, name='angle_output'))  # Output for steering angle
+    model.add(Dense(100, activation=activation))
+    model.add(Dense(50, activation=activation))
+    model.add(Dense(10, activation=activation))
+    model.add(Dense(1, name='angle_output', dtype='float32'))  # Output for steering angle, kept float32 for the loss
     
     model.compile(optimizer=Adam(lr=0.0001), loss={'angle_output': 'mse'})
 
     return model
 
 #### STEP 8 - TRAINNING
-def dataGen(imagesPath, speedList, angleList, batchSize, trainFlag):
-    # Generates batches of augmented data for training or validation
-    while True:
-        imgBatch = []
-        speedBatch = []
-        angleBatch = []
-
-        for _ in range(batchSize):
-            index = random.randint(0, len(imagesPath) - 1)
-            if trainFlag:
-                img, speed, angle = augmentImage(imagesPath[index], speedList[index], angleList[index])
-            else:
-                img = mpimg.imread(imagesPath[index])
-                speed = speedList[index]
-                angle = angleList[index]
-            img = preProcess(img)
-            imgBatch.append(img)
-            speedBatch.append(speed)
-            angleBatch.append(angle)
-        
-        yield (np.asarray(imgBatch), {'angle_output': np.asarray(angleBatch)})
+SHUFFLE_BUFFER = 1000  # Number of cached images shuffled together
+
+def loadSample(imgPath):
+    # Reads and preprocesses one image
+    return preProcess(mpimg.imread(imgPath.decode()))
+
+def dataGen(imagesPath, speedList, angleList, batchSize, trainFlag, cacheFile=''):
+    # Builds a tf.data pipeline that loads samples in parallel and prefetches batches
+    # Preprocessed images are cached after the first pass, in memory or in cacheFile if given
+    # Only the steering angle is predicted, so speedList is not used
+    def load(imgPath, angle):
+        img = tf.numpy_function(loadSample, [imgPath], tf.uint8)
+        img.set_shape((66, 200, 3))
+        return img, tf.cast(angle, tf.float32)
+
+    dataset = tf.data.Dataset.from_tensor_slices((imagesPath, angleList))
+    dataset = dataset.shuffle(len(imagesPath), reshuffle_each_iteration=False)
+    # Samples are shuffled anyway, so loaded images may be returned as soon as they are ready
+    dataset = dataset.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False).cache(cacheFile)
+    dataset = dataset.shuffle(SHUFFLE_BUFFER).repeat()
+    # The dataset repeats, so no samples are dropped; this only gives batches a static shape
+    dataset = dataset.batch(batchSize, drop_remainder=True).map(lambda img, angle: (tf.cast(img, tf.float32), angle))
+    if trainFlag:
+        dataset = dataset.map(augmentBatch, num_parallel_calls=tf.data.AUTOTUNE)
+    dataset = dataset.map(lambda img, angle: (img, {'angle_output': angle}))
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+#### STEP 9 - SAVE THE MODEL
+def saveTfliteModel(model, imagesPath, filePath, nSamples=100, quantization='int8', activation='elu'):
+    # Converts the model to TensorFlow Lite for the Raspberry Pi
+    # quantization 'int8' quantizes weights and activations, calibrated on nSamples of imagesPath,
+    # and takes the uint8 image as input while the angle output stays float;
+    # 'float16' only stores the weights as float16, halving the file without a calibration set
+    # The weights are copied into a float32 model, built with the activation used in training,
+    # in case training used mixed precision, and the augmentation layers are left out
+    policy = tf.keras.mixed_precision.global_policy()
+    tf.keras.mixed_precision.set_global_policy('float32')
+    float32Model = createModel(activation)
+    tf.keras.mixed_precision.set_global_policy(policy)
+    float32Model.set_weights(model.get_weights())
+    inferenceModel = Sequential([tf.keras.Input(shape=(66, 200, 3))] + float32Model.layers[1:])
+
+    def representativeData():
+        # Calibrates the int8 ranges on real preprocessed images
+        for imgPath in imagesPath[:nSamples]:
+            yield [loadSample(imgPath.encode())[np.newaxis].astype(np.float32)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(inferenceModel)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'int8':
+        converter.representative_dataset = representativeData
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+    elif quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        raise ValueError(f'Unknown quantization: {quantization}')
+    with open(filePath, 'wb') as f:
+        f.write(converter.convert())
@@ -2,10 +2,11 @@
 Autonomous Car Controller
 =========================
 
-This script controls an autonomous car's movement using a pre-trained model to predict speed and steering angle from camera input.
+This script controls an autonomous car's movement using a pre-trained TensorFlow Lite model to predict the steering angle from camera input.
 
 It initializes modules for the PiCamera module for image capture and UART communication to send control commands.
-The script continuously captures images, processes them, and uses a machine learning model to predict the speed and steering angle to control the car's movement.
+The script continuously captures images, processes them, and uses a machine learning model to predict the steering angle to control the car's movement.
+The car drives at the constant speed SPEED.
 
 Modules:
 --------
@@ -14,15 +15,22 @@ Modules:
 
 Global Variables:
 -----------------
-- speed : Initial speed.
+- speed : Current speed.
 - angle : Initial steering angle.
-- model : Pre-trained machine learning model for speed and angle prediction.
+- interpreter : TensorFlow Lite interpreter running the pre-trained model for angle prediction.
+- input_index, output_index : Indices of the model input and output tensors.
+- input_lut : Lookup table quantizing pixel values for a uint8 model input, or None if they are written as is.
+- frame_queue : Single-slot queue holding the latest preprocessed frame.
+- frame_buffer : Camera frame buffer reused by the capture thread.
+- free_inputs : Queue of preallocated preprocessed image buffers not in use.
+- capture_error : Exception that stopped the capture thread, or None.
 
 Functions:
 ----------
-- preProcess(img)           : Preprocess the captured image for the model.
+- capture_frames()          : Continuously capture and preprocess frames in a background thread.
+- preProcess(img, out)      : Preprocess the captured image for the model.
 - send_movement_commands()  : Send movement commands over UART based on current speed and angle.
-- main()                    : Main function to capture images, predict speed and angle, and send control commands over UART.
+- main()                    : Main function to capture images, predict the angle, and send control commands over UART.
 
 Example Usage:
 --------------
@@ -32,6 +40,9 @@ To run the script, ensure the required modules (uart_module, picamera_module) ar
 
 Dependencies:
 -------------
+- tflite_runtime: Ensure that the `tflite-runtime` package is installed.
+- libedgetpu: Only needed with USE_EDGETPU; install the Edge TPU runtime (`libedgetpu1-std`). The model must
+  be trained with ReLU activations for the Edge TPU to run it.
 - uart_module: Ensure that the `uart_module` module is properly implemented and available.
 - picamera_module: Ensure that the `picamera_module` module is properly implemented and available.
 
@@ -42,9 +53,11 @@ This script is designed to control an autonomous car system and requires proper
 
 # Importing necessary modules
 import os
+import queue
+import threading
 import cv2
 import numpy as np
-from tensorflow.keras.models    import load_model
+from tflite_runtime.interpreter import Interpreter, load_delegate
 from uart_module                import UartController
 from picamera_module            import PiCameraController
 
@@ -52,34 +65,122 @@ from picamera_module            import PiCameraController
 SERIAL_PORT = "/dev/ttyS0"
 BAUD_RATE   = 9600
 ROI         = (0.0, 0.2, 0.8, 0.8)  # Ratio of interest
-MODEL_PATH  = "path_to_your_model.h5"  # Update with your model path
+SPEED       = 0.5  # Driving speed; the model only predicts the steering angle, as in Step2-Training
+# Run the model on a Coral Edge TPU instead of the CPU. The Edge TPU has no ELU op and the compiler stops
+# mapping at the first unsupported op, so the model must be retrained with ACTIVATION = 'relu' in
+# Step2-Training, then compiled with `edgetpu_compiler -s model.tflite`; the -s summary should list every
+# op as mapped to the Edge TPU, otherwise the remaining layers run on the CPU behind USB round trips
+USE_EDGETPU = False
+EDGETPU_LIBRARY = "libedgetpu.so.1"  # Edge TPU runtime library
+# Model exported by Step2-Training (model_fp16.tflite for the float16 variant, model_edgetpu.tflite compiled for the Edge TPU)
+MODEL_PATH  = "model_edgetpu.tflite" if USE_EDGETPU else "model.tflite"
+NUM_THREADS = os.cpu_count() or 4  # Inference threads, one per core; the XNNPACK kernels split convolutions across them
+INPUT_SIZE  = (200, 66)  # Model input size (width, height)
+CAMERA_SIZE = INPUT_SIZE  # Camera output size (width, height); the ISP scales the ROI to the model input
+RESIZE      = CAMERA_SIZE != INPUT_SIZE  # Whether frames need resizing to the model input size
+NICE        = -10  # Scheduling priority increment; raising the priority needs root (CAP_SYS_NICE)
+FRAME_TIMEOUT = 0.5  # Seconds without a new frame before the car is stopped
+PRINT_INTERVAL = 30  # Frames between printed predictions, about once a second
+INPUT_BUFFERS = 3  # Preprocessed images being written, waiting and fed to the model at the same time
+
+# Raise the priority before the interpreter and capture threads start, so that they all inherit it
+try:
+    os.nice(NICE)
+except PermissionError:
+    print("Could not raise the scheduling priority, run as root to keep other processes from preempting the car")
 
 # Global Variables
 speed = 0  # Initial speed
 angle = 0  # Initial steering angle
-model = load_model(MODEL_PATH)
+delegates = [load_delegate(EDGETPU_LIBRARY)] if USE_EDGETPU else []
+interpreter = Interpreter(model_path=MODEL_PATH, num_threads=NUM_THREADS, experimental_delegates=delegates)
+interpreter.allocate_tensors()
+input_details = interpreter.get_input_details()[0]
+input_index = input_details['index']
+output_index = interpreter.get_output_details()[0]['index']
+
+# An int8 model takes quantized uint8 input; map pixel values to it with a lookup table unless it is the identity
+input_lut = None
+if input_details['dtype'] == np.uint8:
+    input_scale, input_zero_point = input_details['quantization']
+    lut = np.clip(np.round(np.arange(256) / input_scale + input_zero_point), 0, 255).astype(np.uint8)
+    if not np.array_equal(lut, np.arange(256)):
+        input_lut = lut
+
+# Run one inference up front so the first frame does not pay for kernel preparation
+interpreter.tensor(input_index)().fill(0)
+interpreter.invoke()
+frame_queue = queue.Queue(maxsize=1)
+frame_buffer = np.zeros((CAMERA_SIZE[1], CAMERA_SIZE[0], 3), dtype=np.uint8)  # Reused camera frame
+free_inputs = queue.Queue()  # Preprocessed image buffers the capture thread may write into
+for _ in range(INPUT_BUFFERS):
+    free_inputs.put(np.empty((INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8))
 
 # Initializing modules
 uart_controller = UartController(SERIAL_PORT, BAUD_RATE)
 
 camera_controller = PiCameraController()
-camera_controller.pi_cam_init(ROI)
+camera_controller.pi_cam_init(ROI, CAMERA_SIZE)
+capture_error = None  # Exception that stopped the capture thread
 
-def preProcess(img):
+def capture_frames():
+    """
+    Continuously capture and preprocess frames, keeping only the latest one in frame_queue.
+
+    This function runs in a background thread so that capturing and preprocessing the next frame
+    overlap with inference. A frame that has not been consumed yet is replaced, so the model never
+    works on a stale frame. Frames are preprocessed into the buffers of free_inputs, and dropped
+    frames return their buffer there. If capturing or preprocessing fails, the error is stored in
+    capture_error and a `None` frame is queued so that the main loop stops the car.
+    
+    Args:
+        None
+    
+    Returns:
+        None
+    """
+    global capture_error
+    try:
+        while True:
+            frame = camera_controller.get_frame_into(frame_buffer)
+            img = preProcess(frame, free_inputs.get())  # Preprocess the image
+            if input_lut is not None:
+                cv2.LUT(img, input_lut, dst=img)  # Quantize the image for the uint8 model input
+            try:
+                free_inputs.put(frame_queue.get_nowait())  # Drop the unconsumed frame
+            except queue.Empty:
+                pass
+            frame_queue.put(img)
+    except Exception as error:
+        capture_error = error
+        try:
+            frame_queue.get_nowait()  # Make room for the stop signal
+        except queue.Empty:
+            pass
+        frame_queue.put(None)
+
+def preProcess(img, out=None):
     """
     Preprocess the captured image for the model.
 
+    The image is resized first so that the colour conversion works on the small image, and is only
+    resized when the camera output size differs from the model input size. Area resizing, like the
+    camera's own scaler, averages the pixels it shrinks, so no separate blur is needed. The YUV image
+    is written into `out`, so no new array is allocated per frame when a buffer is passed.
+    The steps must match the preprocessing used in Step2-Training. Camera frames are in [B, G, R]
+    order while training reads its JPEGs as RGB, so the frame is converted from BGR to get the same YUV values.
+
     Args:
-        img (numpy.ndarray): The input image.
+        img (numpy.ndarray): The input image in [B, G, R] order.
+        out (numpy.ndarray, optional): Buffer of the model input shape receiving the result.
 
     Returns:
         numpy.ndarray: Preprocessed image.
     """
-    img = cv2.cvtColor(img, cv2.COLOR_RGB2YUV)  # Convert to YUV color space
-    img = cv2.GaussianBlur(img, (3, 3), 0)  # Apply Gaussian blur
-    img = cv2.resize(img, (200, 66))  # Resize the image
-    img = img / 255.0  # Normalize the image
-    return img
+    if RESIZE:
+        img = cv2.resize(img, INPUT_SIZE, interpolation=cv2.INTER_AREA)  # Resize the image
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2YUV, dst=out)  # Convert to YUV color space
+    return img  # The model normalizes the image itself
 
 def send_movement_commands():
     """
@@ -98,9 +199,11 @@ def send_movement_commands():
 
 def main():
     """
-    Main function to capture images, predict speed and angle, and send control commands over UART.
+    Main function to capture images, predict the angle, and send control commands over UART.
 
-    This function continuously captures images, processes them, and uses a pre-trained model to predict the speed and steering angle to control the car's movement.
+    This function continuously takes the preprocessed images from the capture thread and uses a pre-trained model to predict the steering angle to control the car's movement.
+    The car drives at the constant speed SPEED. If the capture thread fails or no frame arrives within
+    FRAME_TIMEOUT seconds, the car is stopped and the error is raised.
     
     Args:
         None
@@ -108,22 +211,39 @@ def main():
     Returns:
         None
     """
-    global speed, angle, model
+    global speed, angle
+    # Preprocess a blank frame once, like the warm-up inference, so OpenCV's lazy initialization
+    # does not delay the first camera frame
+    preProcess(frame_buffer)
+    threading.Thread(target=capture_frames, daemon=True).start()
+    frame_count = 0
     try:
         while True:
-            img_path = camera_controller.get_img()  # Capture image and get path
-            img = cv2.imread(img_path)
-            img = np.asarray(img)  # Convert to numpy array
-            img = preProcess(img)  # Preprocess the image
-            img = np.expand_dims(img, axis=0)  # Add batch dimension
-            prediction = model.predict(img)  # Predict angle and speed
-            speed = float(prediction[0][0])  # Extract speed
-            angle = float(prediction[0][1])  # Extract angle
-
-            print(f"Angle: {angle}, Speed: {speed}")  # Print values
+            try:
+                img = frame_queue.get(timeout=FRAME_TIMEOUT)  # Wait for the latest preprocessed frame
+            except queue.Empty:
+                raise RuntimeError(f"No camera frame for {FRAME_TIMEOUT} s") from None
+            if img is None:
+                raise RuntimeError("Capture thread stopped") from capture_error
+            # Write the image into the input tensor, converting it to the input type in the same pass.
+            # The tensor view must not be kept alive across invoke().
+            interpreter.tensor(input_index)()[0] = img
+            free_inputs.put(img)  # Hand the buffer back to the capture thread
+            interpreter.invoke()  # Predict angle
+            # get_tensor copies the small output, so no view of the interpreter's memory outlives invoke()
+            prediction = interpreter.get_tensor(output_index)
+            angle = prediction.item(0)  # Extract angle, the model's only output
+            speed = SPEED
+
+            frame_count += 1
+            if frame_count % PRINT_INTERVAL == 0:
+                print(f"Angle: {angle}, Speed: {speed}")  # Print values without blocking every frame on the console
             send_movement_commands()
-            cv2.waitKey(1)  # Wait for 1 ms
+            uart_controller.flush()
     except KeyboardInterrupt:
+        pass
+    finally:
+        # Stop the car on Ctrl+C as well as on any error, so it never keeps executing the last command
         uart_controller.send_data("stop")
         uart_controller.close()
 
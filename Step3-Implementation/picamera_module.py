@@ -17,6 +17,9 @@ To use this module, create an instance of `PiCameraController` and call its meth
     camera_controller = PiCameraController()
     camera_controller.pi_cam_init()
     camera_controller.get_img("example_image")
+    frame = camera_controller.get_frame()
+    camera_controller.get_frame_into(frame)
+    camera_controller.close()
 
 To test this module, you can run it directly as a script. It will initialize the camera and capture 10 images named 'test_0.jpg' to 'test_9.jpg'.
 
@@ -25,14 +28,23 @@ To test this module, you can run it directly as a script. It will initialize the
 Dependencies:
 -------------
 - picamera2: Ensure that the `picamera2` library is installed and properly configured on your system.
+- simplejpeg: Installed together with `picamera2`; used to encode images with libjpeg-turbo.
 
 Note:
 -----
 This script is intended to run on a Raspberry Pi with a connected camera module.
 """
 
-from picamera2 import Picamera2
-import time
+from picamera2 import Picamera2, MappedArray
+import numpy as np
+import simplejpeg
+import queue
+import threading
+
+IMG_SIZE = (240, 120)      # Output image size (width, height)
+WRITE_QUEUE_SIZE = 64      # Maximum number of images waiting to be saved
+JPEG_QUALITY = 90          # Quality of the saved JPEG images
+WARMUP_FRAMES = 60         # Frames discarded at start-up while exposure and white balance settle
 
 class PiCameraController:
     def __init__(self):
@@ -40,34 +52,120 @@ class PiCameraController:
         Initialize the PiCameraController class.
         """
         self.pi_cam = None
+        self.write_queue = None
+        self.writer_thread = None
+        self.write_error = None
 
-    def pi_cam_init(self, roi=None):
+    def pi_cam_init(self, roi=None, size=IMG_SIZE):
         """
         Initialize and start the PiCamera.
 
         This method sets up the `pi_cam` attribute, configures the camera, and starts it.
+        The camera ISP crops frames to `roi` and scales them to `size` in a single pass,
+        so no cropping or resizing is needed on the CPU. Frames are not queued, so every
+        capture returns a frame started after the request instead of a stale buffered one.
+        The sensor runs in its smallest mode that still covers the full field of view.
         
         Args:
         roi (tuple, optional): A tuple defining the region of interest (ROI) as (x, y, width, height).
                                Each value should be a proportion of the total image dimensions (0.0 to 1.0).
+        size (tuple, optional): Output image size as (width, height). Default is (240, 120).
         
         Returns:
         None
         """
         self.pi_cam = Picamera2()
-        config = self.pi_cam.create_still_configuration()
+        controls = {}
+        if roi:
+            controls["ScalerCrop"] = self.get_scaler_crop(roi)
+        sensor_mode = self.get_sensor_mode()
+        raw = {"size": sensor_mode["size"]} if sensor_mode else {}
+        config = self.pi_cam.create_video_configuration(main={"size": size, "format": "RGB888"}, raw=raw,
+                                                        controls=controls, queue=False)
         self.pi_cam.configure(config)
         self.pi_cam.start()
 
-        # Allow the camera to warm up
-        time.sleep(2)
+        # Allow the camera to warm up by discarding the first frames
+        for _ in range(WARMUP_FRAMES):
+            self.pi_cam.capture_metadata()
 
-        if roi:
-            self.pi_cam.set_controls({"ScalerCrop": roi})
+        # Save images in the background so capturing never waits on disk I/O
+        self.write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self.writer_thread = threading.Thread(target=self._write_images, daemon=True)
+        self.writer_thread.start()
+
+    def get_sensor_mode(self):
+        """
+        Find the smallest sensor mode that still covers the whole pixel array.
+
+        Binned modes read out fewer pixels, which lowers the bandwidth into the ISP
+        without narrowing the field of view the ROI is taken from.
+
+        Args:
+        None
+        
+        Returns:
+        dict: The sensor mode, or None if no mode covers the whole pixel array.
+        """
+        full_size = tuple(self.pi_cam.camera_properties["PixelArraySize"])
+        modes = [mode for mode in self.pi_cam.sensor_modes if tuple(mode["crop_limits"][2:]) == full_size]
+        return min(modes, key=lambda mode: mode["size"][0] * mode["size"][1], default=None)
+
+    def get_scaler_crop(self, roi):
+        """
+        Convert a proportional region of interest into a sensor pixel rectangle.
+
+        Args:
+        roi (tuple): The region of interest as (x, y, width, height) proportions (0.0 to 1.0).
+        
+        Returns:
+        tuple: The `ScalerCrop` rectangle as (x, y, width, height) in sensor pixels.
+        """
+        sensor_width, sensor_height = self.pi_cam.camera_properties["PixelArraySize"]
+        x, y, width, height = roi
+        return (int(x * sensor_width), int(y * sensor_height),
+                int(width * sensor_width), int(height * sensor_height))
+
+    def get_frame(self):
+        """
+        Capture an image and return it without saving it.
+
+        Args:
+        None
+        
+        Returns:
+        numpy.ndarray: The captured image as a (height, width, 3) array in [B, G, R] order.
+        """
+        return self.pi_cam.capture_array("main")
+
+    def get_frame_into(self, buffer):
+        """
+        Capture an image into a preallocated array.
+
+        The frame is copied straight out of the camera's memory-mapped buffer into `buffer`,
+        so repeated captures do not allocate a new array each time.
+
+        Args:
+        buffer (numpy.ndarray): A (height, width, 3) uint8 array matching the output size.
+        
+        Returns:
+        numpy.ndarray: `buffer`, holding the captured image in [B, G, R] order.
+        """
+        request = self.pi_cam.capture_request()
+        try:
+            with MappedArray(request, "main") as mapped:
+                np.copyto(buffer, mapped.array)
+        finally:
+            request.release()
+        return buffer
 
     def get_img(self, file_name):
         """
-        Capture an image and save it with the provided file name.
+        Capture an image and queue it to be saved with the provided file name.
+
+        The image is written by a background thread. If the queue is full, this method
+        blocks until there is room, so no captured image is ever dropped. If saving an
+        earlier image failed, the error is raised here instead.
 
         Args:
         file_name (str): The name to save the image file as, without file extension.
@@ -75,7 +173,68 @@ class PiCameraController:
         Returns:
         None
         """
-        self.pi_cam.capture_file(f"{file_name}.jpg")
+        self.check_write_error()
+        self.write_queue.put((file_name, self.get_frame()))
+
+    def check_write_error(self):
+        """
+        Raise the error that stopped the background writer, if there was one.
+
+        Args:
+        None
+        
+        Returns:
+        None
+        """
+        if self.write_error is not None:
+            raise RuntimeError("Saving a captured image failed") from self.write_error
+
+    def _write_images(self):
+        """
+        Encode queued frames as JPEG and save them to disk until a `None` sentinel is received.
+
+        The first error (e.g. a full SD card) is stored in `write_error` to be raised by
+        `get_img` or `close`. Later frames are discarded, but the queue keeps being drained
+        so that no caller blocks on it.
+
+        RGB888 frames are stored in [B, G, R] order, hence the BGR colorspace.
+
+        Args:
+        None
+        
+        Returns:
+        None
+        """
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                break
+            if self.write_error is not None:
+                continue
+            file_name, frame = item
+            try:
+                jpeg = simplejpeg.encode_jpeg(frame, quality=JPEG_QUALITY, colorspace="BGR")
+                with open(f"{file_name}.jpg", "wb") as file:
+                    file.write(jpeg)
+            except Exception as error:
+                self.write_error = error
+
+    def close(self):
+        """
+        Wait for all queued images to be saved and stop the camera.
+
+        If saving an image failed, the error is raised after the camera is stopped.
+
+        Args:
+        None
+        
+        Returns:
+        None
+        """
+        self.write_queue.put(None)
+        self.writer_thread.join()
+        self.pi_cam.stop()
+        self.check_write_error()
 
 def main():
     """
@@ -100,6 +259,7 @@ def main():
     while count < 10:
         camera_controller.get_img(f"test_{count}")
         count += 1
+    camera_controller.close()
 
 if __name__ == '__main__':
     main()
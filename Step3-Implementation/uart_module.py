@@ -16,6 +16,7 @@ To use this module, create an instance of `UartController` and call its methods.
 
     uart_controller = UartController("/dev/ttyS0", 9600)
     uart_controller.send_data("Hello, UART!")
+    uart_controller.flush()
     data = uart_controller.receive_data()
 
 To test this module, you can run it directly as a script. It will perform a series of UART operations.
@@ -42,6 +43,8 @@ class UartController:
         """
         Initialize the UART interface with the specified port and baudrate.
 
+        The port is opened here, and an exception is raised if that fails.
+
         Args:
             port: UART port (e.g., "/dev/ttyS0").
             baudrate: Baud rate for UART communication.
@@ -49,16 +52,33 @@ class UartController:
         self.port = port
         self.baudrate = baudrate
         self.serial_connection = serial.Serial(port, baudrate)
+        self.last_sent = None
+        self.tx_buffer = bytearray()
 
     def send_data(self, data):
         """
-        Send data over UART.
+        Queue data to be sent over UART by the next call to `flush()`.
+
+        Data identical to the previously sent data is skipped, since the receiver
+        already acts on it.
 
         Args:
-            data: Data to be sent as a string.
+            data: Data to be sent as a string, or as bytes if already encoded.
         """
-        if self.serial_connection.is_open:
-            self.serial_connection.write(data.encode())
+        if data == self.last_sent:
+            return
+        self.tx_buffer += data.encode() if isinstance(data, str) else data
+        self.last_sent = data
+
+    def flush(self):
+        """
+        Write all queued data to the UART in a single write.
+
+        The connection must not have been closed.
+        """
+        if self.tx_buffer:
+            self.serial_connection.write(self.tx_buffer)
+            self.tx_buffer.clear()
 
     def receive_data(self, timeout=1):
         """
@@ -77,8 +97,9 @@ class UartController:
         return ""
 
     def close(self):
-        """Close the UART connection."""
+        """Send any queued data and close the UART connection."""
         if self.serial_connection.is_open:
+            self.flush()
             self.serial_connection.close()
 
 def main():
@@ -101,11 +122,15 @@ def main():
     uart_controller = UartController("/dev/ttyS0", 9600)
     print("UART initialized.")
 
+    count = 0
     try:
         while True:
-            # Send data
-            uart_controller.send_data("Hello, UART!")
-            print("Sent: Hello, UART!")
+            # Send data (numbered, since repeated data is not sent again)
+            message = f"Hello, UART! {count}"
+            uart_controller.send_data(message)
+            uart_controller.flush()
+            print(f"Sent: {message}")
+            count += 1
             time.sleep(1)
 
             # Receive data